@@ -21,7 +21,6 @@ Usage:
 
 import argparse
 import os
-import subprocess
 import sys
 from pathlib import Path
 
@@ -108,8 +107,8 @@ Environment Variables:
         print(f"Error: AI generation script not found: {ai_script}")
         sys.exit(1)
     
-    # Build command
-    cmd = [sys.executable, str(ai_script), args.prompt, "-o", args.output]
+    # Build arguments for the AI generation script
+    cmd = [str(ai_script), args.prompt, "-o", args.output]
     
     if args.doc_type != "default":
         cmd.extend(["--doc-type", args.doc_type])
@@ -125,13 +124,21 @@ Environment Variables:
     if args.verbose:
         cmd.append("-v")
     
-    # Execute
+    # Execute in-process: import the sibling module and run its CLI with our
+    # arguments instead of starting a second Python interpreter
+    if str(script_dir) not in sys.path:
+        sys.path.insert(0, str(script_dir))
+    saved_argv = sys.argv
+    sys.argv = cmd
     try:
-        result = subprocess.run(cmd, check=False)
-        sys.exit(result.returncode)
+        import generate_schematic_ai
+        generate_schematic_ai.main()
     except Exception as e:
         print(f"Error executing AI generation: {e}")
         sys.exit(1)
+    finally:
+        sys.argv = saved_argv
+    sys.exit(0)
 
 
 if __name__ == "__main__":
@@ -30,7 +30,7 @@ Example:
         > Create a NeurIPS paper on transformer attention mechanisms
 """
 
-from .api import generate_paper
+from .api import generate_paper, generate_paper_sse
 from .models import ProgressUpdate, TextUpdate, PaperResult, PaperMetadata, PaperFiles, TokenUsage
 
 __version__ = "2.12.1"
@@ -39,6 +39,7 @@ __license__ = "MIT"
 
 __all__ = [
     "generate_paper",
+    "generate_paper_sse",
     "ProgressUpdate",
     "TextUpdate",
     "PaperResult",
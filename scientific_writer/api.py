@@ -1,15 +1,20 @@
 """Async API for programmatic scientific document generation."""
 
 import asyncio
+import functools
+import json
+import operator
 import os
+import re
 import time
 from pathlib import Path
-from typing import Optional, List, Dict, Any, AsyncGenerator, Union, Literal
+from typing import Optional, List, Dict, Any, AsyncGenerator, Union, Literal, TYPE_CHECKING
 from datetime import datetime
-from dotenv import load_dotenv
 
-from claude_agent_sdk import query as claude_query, ClaudeAgentOptions
-from claude_agent_sdk.types import HookMatcher, StopHookInput, HookContext
+# claude_agent_sdk and dotenv are imported where first used, so importing this
+# module (e.g. for the analysis helpers) stays cheap
+if TYPE_CHECKING:
+    from claude_agent_sdk.types import StopHookInput, HookContext
 
 from .core import (
     get_api_key,
@@ -25,8 +30,7 @@ from .utils import (
     scan_paper_directory,
     count_citations_in_bib,
     extract_citation_style,
-    count_words_in_tex,
-    extract_title_from_tex,
+    parse_tex_once,
 )
 
 # Model mapping for effort levels
@@ -36,34 +40,178 @@ EFFORT_LEVEL_MODELS = {
     "high": "claude-sonnet-4-6",
 }
 
+# Package directory (scientific_writer/) containing .claude/ to copy into working directories
+_PACKAGE_DIR = Path(__file__).resolve().parent
+
+# Stage order for progression tracking, with O(1) index lookup
+_STAGE_ORDER = ("initialization", "planning", "research", "writing", "compilation", "complete")
+_STAGE_INDEX = {name: i for i, name in enumerate(_STAGE_ORDER)}
+
+# Text keywords that signal a stage transition in _analyze_progress
+_COMPILATION_TEXT_RE = re.compile(r"pdflatex|latexmk|compiling", re.IGNORECASE)
+_COMPLETION_TEXT_RE = re.compile(r"successfully compiled|pdf generated", re.IGNORECASE)
+
+# Trailing characters of streamed text kept so keywords split across blocks are still seen
+_PROGRESS_WINDOW_CHARS = 512
+
+# Filename keywords -> section names for progress messages
+_SECTION_MAPPINGS = {
+    'abstract': 'abstract',
+    'intro': 'introduction',
+    'introduction': 'introduction',
+    'method': 'methods',
+    'methods': 'methods',
+    'methodology': 'methodology',
+    'result': 'results',
+    'results': 'results',
+    'discussion': 'discussion',
+    'conclusion': 'conclusion',
+    'conclusions': 'conclusions',
+    'background': 'background',
+    'related': 'related work',
+    'experiment': 'experiments',
+    'experiments': 'experiments',
+    'evaluation': 'evaluation',
+    'appendix': 'appendix',
+    'supplement': 'supplementary material',
+}
+# Longest keywords first so e.g. "methodology" is not shadowed by "method"
+_SECTION_RE = re.compile("|".join(sorted(_SECTION_MAPPINGS, key=len, reverse=True)))
+
+# Bash tool: commands worth reporting, checked in priority order. A name only
+# counts as a whole word not joined to '-', '.' or '/', so "cp a.pdf out/" and
+# "cd out && ls" match, while "java -cp lib Main", "python script-cp.py",
+# "git ls-files" and "convert cat-photo.png" do not.
+_BASH_COMMAND_RE = re.compile(r"(?<![\w.-])(pdflatex|latexmk|bibtex|makeindex|mkdir|cp|mv|ls|cat)(?![\w./-])")
+
+
+# Token usage attributes read from each streamed message when tracking is enabled
+_USAGE_FIELDS = ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+_USAGE_GET = operator.attrgetter(*_USAGE_FIELDS)
+
+
+def _usage_tuple(usage: Any) -> tuple:
+    """Return (input, output, cache_creation, cache_read) token counts; missing fields count as 0."""
+    try:
+        return _USAGE_GET(usage)
+    except AttributeError:
+        return tuple(getattr(usage, name, 0) for name in _USAGE_FIELDS)
+
+
+# Constant fields of ProgressUpdate.to_dict(); timestamp, message and stage are set per event
+_PROGRESS_TEMPLATE = ProgressUpdate().to_dict()
+
+
+def _progress_dict(message: str, stage: str, details: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Build a progress update dict equivalent to ProgressUpdate(...).to_dict().
+    
+    Used in the streaming loop to avoid instantiating and serializing a
+    dataclass for every progress event.
+    """
+    update = dict(
+        _PROGRESS_TEMPLATE,
+        timestamp=datetime.utcnow().isoformat() + "Z",
+        message=message,
+        stage=stage,
+    )
+    if details is not None:
+        update["details"] = details
+    return update
+
+
+class _TokenBuffer:
+    """
+    Merge short text blocks within one SDK message into fewer TextUpdate events.
+    
+    Text is held until max_chars characters are buffered; the caller flushes
+    any remainder before tool use and at the end of each message.
+    """
+    
+    def __init__(self, max_chars: int = 64):
+        self.max_chars = max_chars
+        self._parts: List[str] = []
+        self._size = 0
+    
+    def __bool__(self) -> bool:
+        return bool(self._parts)
+    
+    def append(self, text: str) -> bool:
+        """Buffer text and return True if the buffer should be flushed."""
+        self._parts.append(text)
+        self._size += len(text)
+        return self._size >= self.max_chars
+    
+    def flush(self) -> str:
+        """Return all buffered text and reset the buffer."""
+        text = "".join(self._parts)
+        self._parts.clear()
+        self._size = 0
+        return text
+
+
+@functools.lru_cache(maxsize=32)
+def _cached_load_env(env_file: Path, mtime: float) -> Dict[str, str]:
+    """Parse a .env file once per (path, mtime) so edits invalidate the cache."""
+    from dotenv import dotenv_values
+    
+    return {k: v for k, v in dotenv_values(env_file).items() if v is not None}
+
+
+def _prepare_workdir(work_dir: Path) -> None:
+    """
+    Load .env and set up Claude skills for a working directory.
+    
+    Repeated calls for the same working directory reuse the parsed .env
+    values until the file changes.
+    
+    Args:
+        work_dir: Resolved working directory
+    """
+    # Load .env from working directory (override=True semantics)
+    env_file = work_dir / ".env"
+    try:
+        env_mtime = env_file.stat().st_mtime
+    except OSError:
+        env_mtime = None
+    if env_mtime is not None:
+        os.environ.update(_cached_load_env(env_file, env_mtime))
+    
+    # Copy skills from the package directory to the working directory
+    setup_claude_skills(_PACKAGE_DIR, work_dir)
+
+
+async def _always_continue_hook(
+    hook_input: "StopHookInput",
+    matcher: str | None,
+    context: "HookContext",
+) -> dict:
+    """
+    Stop hook that forces continuation.
+    
+    Returns continue_=True so the agent keeps working instead of stopping.
+    """
+    return {"continue_": True}
+
+
+async def _allow_stop_hook(
+    hook_input: "StopHookInput",
+    matcher: str | None,
+    context: "HookContext",
+) -> dict:
+    """Stop hook that allows the agent to stop normally."""
+    return {"continue_": False}
+
 
 def create_completion_check_stop_hook(auto_continue: bool = True):
     """
-    Create a stop hook that optionally forces continuation.
+    Return a stop hook that optionally forces continuation.
     
     Args:
         auto_continue: If True, always continue (never stop on agent's own).
                       If False, allow normal stopping behavior.
     """
-    async def completion_check_stop_hook(
-        hook_input: StopHookInput,
-        matcher: str | None,
-        context: HookContext,
-    ) -> dict:
-        """
-        Stop hook that checks if the task is complete before allowing stop.
-        
-        When auto_continue is True, this returns continue_=True to force
-        the agent to continue working instead of stopping.
-        """
-        if auto_continue:
-            # Force continuation - the agent should not stop on its own
-            return {"continue_": True}
-        
-        # Allow the stop
-        return {"continue_": False}
-    
-    return completion_check_stop_hook
+    return _always_continue_hook if auto_continue else _allow_stop_hook
 
 
 async def generate_paper(
@@ -76,7 +224,8 @@ async def generate_paper(
     cwd: Optional[str] = None,
     track_token_usage: bool = False,
     auto_continue: bool = True,
-) -> AsyncGenerator[Dict[str, Any], None]:
+    raw: bool = False,
+) -> AsyncGenerator[Union[Dict[str, Any], ProgressUpdate, TextUpdate, PaperResult], None]:
     """
     Generate a scientific document asynchronously with progress updates.
     
@@ -94,16 +243,20 @@ async def generate_paper(
             - "low": Uses Claude Haiku 4.5 (fastest, most economical)
             - "medium": Uses Claude Sonnet 4.5 (balanced) [default]
             - "high": Uses Claude Opus 4.6 (most capable)
-        data_files: Optional list of data file paths to include
+        data_files: Optional list of data file paths to include (relative paths are resolved against cwd)
         cwd: Optional working directory (defaults to package parent directory)
         track_token_usage: If True, track and return token usage in the final result
         auto_continue: If True (default), the agent will not stop on its own and will
             continue working until the task is complete. Set to False to allow
             normal stopping behavior.
+        raw: If True, yield the ProgressUpdate/TextUpdate/PaperResult objects
+            themselves instead of converting each one to a dict. Useful when the
+            consumer runs in the same process and doesn't need serialization.
     
     Yields:
         Progress updates (dict with type="progress") during execution
         Final result (dict with type="result") containing all document information
+        (model instances instead of dicts when raw=True)
         
     Example:
         ```python
@@ -120,42 +273,47 @@ async def generate_paper(
                 print(f"Token usage: {update.get('token_usage')}")
         ```
     """
+    from claude_agent_sdk import query as claude_query, ClaudeAgentOptions
+    from claude_agent_sdk import types as sdk_types
+    from claude_agent_sdk.types import HookMatcher
+    
+    # Content block classes for type dispatch (None falls back to attribute probing)
+    text_block_cls = getattr(sdk_types, "TextBlock", None)
+    tool_use_block_cls = getattr(sdk_types, "ToolUseBlock", None)
+    
     # Initialize
     start_time = time.time()
     
+    # Yield model instances when raw=True, dicts otherwise
+    make_progress = ProgressUpdate if raw else _progress_dict
+    
+    def emit(update):
+        return update if raw else update.to_dict()
+    
     # Resolve model: explicit model parameter takes precedence, otherwise use effort_level
     if model is None:
         model = EFFORT_LEVEL_MODELS[effort_level]
     
-    # Explicitly load .env file from working directory
     # Determine working directory first
     if cwd:
         work_dir = Path(cwd).resolve()
     else:
         work_dir = Path.cwd().resolve()
     
-    # Load .env from working directory
-    env_file = work_dir / ".env"
-    if env_file.exists():
-        load_dotenv(dotenv_path=env_file, override=True)
+    # Load .env and set up Claude skills (includes WRITER.md) in the working directory
+    _prepare_workdir(work_dir)
     
     # Get API key
     api_key_value = get_api_key(api_key)
     
-    # Get package directory for copying skills to working directory
-    package_dir = Path(__file__).parent.absolute()  # scientific_writer/ directory
-    
-    # Set up Claude skills in the working directory (includes WRITER.md)
-    setup_claude_skills(package_dir, work_dir)
-    
     # Ensure output folder exists in user's directory
     output_folder = ensure_output_folder(work_dir, output_dir)
     
     # Initial progress update
-    yield ProgressUpdate(
+    yield make_progress(
         message="Initializing document generation",
         stage="initialization",
-    ).to_dict()
+    )
     
     # Load system instructions from .claude/WRITER.md in working directory
     system_instructions = load_system_instructions(work_dir)
@@ -178,14 +336,13 @@ IMPORTANT - CONVERSATION CONTINUITY:
     data_context = ""
     temp_paper_path = None
     
-    if data_files:
-        data_file_paths = get_data_files(work_dir, data_files)
-        if data_file_paths:
-            # We'll need to process these after the output directory is created
-            yield ProgressUpdate(
-                message=f"Found {len(data_file_paths)} data file(s) to process",
-                stage="initialization",
-            ).to_dict()
+    # Resolve data files once; they are processed after the output directory is created
+    data_file_paths = get_data_files(work_dir, data_files) if data_files else []
+    if data_file_paths:
+        yield make_progress(
+            message=f"Found {len(data_file_paths)} data file(s) to process",
+            stage="initialization",
+        )
     
     # Check if auto-continue is enabled (parameter takes precedence over env var)
     # Environment variable can override if parameter is True (default)
@@ -217,7 +374,8 @@ IMPORTANT - CONVERSATION CONTINUITY:
     output_directory = None
     last_message = ""  # Track last message to avoid duplicates
     tool_call_count = 0
-    files_written = []
+    files_written: set[str] = set()
+    files_written_count = 0
     
     # Token usage tracking (when enabled)
     total_input_tokens = 0
@@ -225,49 +383,63 @@ IMPORTANT - CONVERSATION CONTINUITY:
     total_cache_creation_tokens = 0
     total_cache_read_tokens = 0
     
-    yield ProgressUpdate(
+    yield make_progress(
         message="Starting document generation",
         stage="initialization",
         details={"query_length": len(query)},
-    ).to_dict()
+    )
+    
+    # Merge short text blocks within a message into fewer TextUpdate events
+    text_buffer = _TokenBuffer()
     
     # Execute query
     try:
-        accumulated_text = ""
+        progress_tail = ""
         async for message in claude_query(prompt=query, options=options):
             # Track token usage if enabled
-            if track_token_usage and hasattr(message, "usage") and message.usage:
-                usage = message.usage
-                total_input_tokens += getattr(usage, "input_tokens", 0)
-                total_output_tokens += getattr(usage, "output_tokens", 0)
-                total_cache_creation_tokens += getattr(usage, "cache_creation_input_tokens", 0)
-                total_cache_read_tokens += getattr(usage, "cache_read_input_tokens", 0)
+            if track_token_usage:
+                usage = getattr(message, "usage", None)
+                if usage:
+                    input_tokens, output_tokens, cache_creation, cache_read = _usage_tuple(usage)
+                    total_input_tokens += input_tokens
+                    total_output_tokens += output_tokens
+                    total_cache_creation_tokens += cache_creation
+                    total_cache_read_tokens += cache_read
             
             if hasattr(message, "content") and message.content:
                 for block in message.content:
+                    block_cls = type(block)
+                    
                     # Handle text blocks - stream live and analyze for progress
-                    if hasattr(block, "text"):
+                    if block_cls is text_block_cls or (text_block_cls is None and hasattr(block, "text")):
                         text = block.text
-                        accumulated_text += text
                         
-                        # Yield live text update - stream Scientific-Writer's actual response
-                        yield TextUpdate(content=text).to_dict()
+                        # Buffer live text - stream Scientific-Writer's actual response
+                        flush_text = text_buffer.append(text)
                         
-                        # Analyze text for major stage transitions (fallback)
-                        stage, msg = _analyze_progress(accumulated_text, current_stage)
+                        # Analyze new text (plus a bounded tail of earlier text) for
+                        # major stage transitions (fallback)
+                        progress_window = progress_tail + text
+                        progress_tail = progress_window[-_PROGRESS_WINDOW_CHARS:]
+                        stage, msg = _analyze_progress(progress_window, current_stage)
                         
                         # Only yield progress if we have a stage change with a message
                         if stage != current_stage and msg and msg != last_message:
                             current_stage = stage
                             last_message = msg
                             
-                            yield ProgressUpdate(
-                                message=msg,
-                                stage=stage,
-                            ).to_dict()
+                            yield emit(TextUpdate(content=text_buffer.flush()))
+                            yield make_progress(message=msg, stage=stage)
+                        elif flush_text:
+                            yield emit(TextUpdate(content=text_buffer.flush()))
                     
                     # Handle tool use blocks - provide detailed progress on actions
-                    elif hasattr(block, "type") and block.type == "tool_use":
+                    elif block_cls is tool_use_block_cls or (
+                        tool_use_block_cls is None and getattr(block, "type", None) == "tool_use"
+                    ):
+                        if text_buffer:
+                            yield emit(TextUpdate(content=text_buffer.flush()))
+                        
                         tool_call_count += 1
                         tool_name = getattr(block, "name", "unknown")
                         tool_input = getattr(block, "input", {})
@@ -275,8 +447,9 @@ IMPORTANT - CONVERSATION CONTINUITY:
                         # Track files being written
                         if tool_name.lower() == "write":
                             file_path = tool_input.get("file_path", tool_input.get("path", ""))
-                            if file_path:
-                                files_written.append(file_path)
+                            if file_path and file_path not in files_written:
+                                files_written.add(file_path)
+                                files_written_count += 1
                         
                         # Analyze tool usage for progress
                         tool_progress = _analyze_tool_use(tool_name, tool_input, current_stage)
@@ -287,42 +460,51 @@ IMPORTANT - CONVERSATION CONTINUITY:
                                 current_stage = stage
                                 last_message = msg
                                 
-                                yield ProgressUpdate(
+                                yield make_progress(
                                     message=msg,
                                     stage=stage,
                                     details={
                                         "tool": tool_name,
                                         "tool_calls": tool_call_count,
-                                        "files_created": len(files_written),
+                                        "files_created": files_written_count,
                                     },
-                                ).to_dict()
+                                )
+                
+                # Flush at the end of each message so text is not held while
+                # waiting for the next one
+                if text_buffer:
+                    yield emit(TextUpdate(content=text_buffer.flush()))
         
         # Document generation complete - now scan for results
-        yield ProgressUpdate(
+        yield make_progress(
             message="Scanning output directory",
             stage="complete",
-        ).to_dict()
+        )
         
         # Find the most recently created output directory
-        output_directory = _find_most_recent_output(output_folder, start_time)
+        output_directory = await asyncio.to_thread(_find_most_recent_output, output_folder, start_time)
         
         if not output_directory:
             error_result = _create_error_result("Output directory not found after generation")
             if track_token_usage:
-                error_result['token_usage'] = TokenUsage(
+                error_result.token_usage = TokenUsage(
                     input_tokens=total_input_tokens,
                     output_tokens=total_output_tokens,
                     cache_creation_input_tokens=total_cache_creation_tokens,
                     cache_read_input_tokens=total_cache_read_tokens,
-                ).to_dict()
-            yield error_result
+                )
+            yield emit(error_result)
             return
         
-        # Process any data files now if we have an output directory
-        if data_files:
-            data_file_paths = get_data_files(work_dir, data_files)
+        # Parse the final .tex in the background while data files are copied;
+        # process_data_files never writes to final/, so the two can overlap
+        tex_task = asyncio.create_task(asyncio.to_thread(_prefetch_final_tex, output_directory))
+        
+        try:
+            # Process any data files now if we have an output directory
             if data_file_paths:
-                processed_info = process_data_files(
+                processed_info = await asyncio.to_thread(
+                    process_data_files,
                     work_dir, 
                     data_file_paths, 
                     str(output_directory),
@@ -333,16 +515,23 @@ IMPORTANT - CONVERSATION CONTINUITY:
                     message = f"Processed {len(processed_info['all_files'])} file(s)"
                     if manuscript_count > 0:
                         message += f" ({manuscript_count} manuscript(s) copied to drafts/)"
-                    yield ProgressUpdate(
+                    yield make_progress(
                         message=message,
                         stage="complete",
-                    ).to_dict()
-        
-        # Scan the output directory for all files
-        file_info = scan_paper_directory(output_directory)
-        
-        # Build comprehensive result
-        result = _build_paper_result(output_directory, file_info)
+                    )
+            
+            # Scan the output directory for all files (after the copies, so they are included)
+            file_info = await asyncio.to_thread(scan_paper_directory, output_directory)
+            
+            # Build comprehensive result
+            result = _build_paper_result(output_directory, file_info, await tex_task)
+        finally:
+            # Do not leave the prefetch pending (or its exception unretrieved) if
+            # the steps above fail or the consumer closes the generator
+            if not tex_task.done():
+                tex_task.cancel()
+            elif not tex_task.cancelled():
+                tex_task.exception()
         
         # Add token usage if tracking is enabled
         if track_token_usage:
@@ -353,25 +542,58 @@ IMPORTANT - CONVERSATION CONTINUITY:
                 cache_read_input_tokens=total_cache_read_tokens,
             )
         
-        yield ProgressUpdate(
+        yield make_progress(
             message="Document generation complete",
             stage="complete",
-        ).to_dict()
+        )
         
         # Final result
-        yield result.to_dict()
+        yield emit(result)
         
     except Exception as e:
+        if text_buffer:
+            yield emit(TextUpdate(content=text_buffer.flush()))
         error_result = _create_error_result(f"Error during document generation: {str(e)}")
         # Include token usage even on error if tracking was enabled
         if track_token_usage:
-            error_result['token_usage'] = TokenUsage(
+            error_result.token_usage = TokenUsage(
                 input_tokens=total_input_tokens,
                 output_tokens=total_output_tokens,
                 cache_creation_input_tokens=total_cache_creation_tokens,
                 cache_read_input_tokens=total_cache_read_tokens,
-            ).to_dict()
-        yield error_result
+            )
+        yield emit(error_result)
+
+
+async def generate_paper_sse(query: str, **kwargs: Any) -> AsyncGenerator[str, None]:
+    """
+    Generate a scientific document and yield updates as Server-Sent Events.
+    
+    Wraps generate_paper() for HTTP streaming endpoints: each update is
+    serialized to JSON and framed as an SSE ``data:`` event. Uses orjson when
+    it is installed, falling back to the standard library json module.
+    
+    Args:
+        query: The document generation request
+        **kwargs: Keyword arguments passed through to generate_paper()
+            (raw is always False)
+    
+    Yields:
+        SSE-formatted strings ("data: {...}\\n\\n")
+    """
+    kwargs["raw"] = False
+    dumps = _json_dumps()
+    async for update in generate_paper(query, **kwargs):
+        yield f"data: {dumps(update)}\n\n"
+
+
+def _json_dumps():
+    """Return the fastest available function serializing a dict to a JSON str."""
+    try:
+        import orjson
+    except ImportError:
+        return json.dumps
+    return lambda obj: orjson.dumps(obj).decode()
 
 
 def _analyze_progress(text: str, current_stage: str) -> tuple:
@@ -384,27 +606,28 @@ def _analyze_progress(text: str, current_stage: str) -> tuple:
     Returns:
         Tuple of (stage, message) - returns current stage if no transition detected
     """
-    text_lower = text.lower()
+    # No further transitions are possible once complete
+    if current_stage == "complete":
+        return current_stage, None
     
-    # Stage order for progression tracking
-    stage_order = ["initialization", "planning", "research", "writing", "compilation", "complete"]
-    current_idx = stage_order.index(current_stage) if current_stage in stage_order else 0
+    current_idx = _STAGE_INDEX.get(current_stage, 0)
     
     # Only detect major stage transitions - let tool analysis handle specifics
     # Check for compilation indicators (most definitive)
-    if current_idx < stage_order.index("compilation"):
-        if "pdflatex" in text_lower or "latexmk" in text_lower or "compiling" in text_lower:
+    if current_idx < _STAGE_INDEX["compilation"]:
+        if _COMPILATION_TEXT_RE.search(text):
             return "compilation", "Compiling document"
     
     # Check for completion indicators
-    if current_idx < stage_order.index("complete"):
-        if "successfully compiled" in text_lower or "pdf generated" in text_lower:
+    if current_idx < _STAGE_INDEX["complete"]:
+        if _COMPLETION_TEXT_RE.search(text):
             return "complete", "Finalizing output"
     
     # No stage transition detected - return current stage without message change
     return current_stage, None
 
 
+@functools.lru_cache(maxsize=256)
 def _detect_document_type(file_path: str) -> str:
     """Detect document type from file path."""
     path_lower = file_path.lower()
@@ -421,35 +644,82 @@ def _detect_document_type(file_path: str) -> str:
 
 def _get_section_from_filename(filename: str) -> str:
     """Extract section name from filename for more descriptive messages."""
-    name_lower = filename.lower().replace('.tex', '').replace('.md', '')
-    
-    section_mappings = {
-        'abstract': 'abstract',
-        'intro': 'introduction',
-        'introduction': 'introduction',
-        'method': 'methods',
-        'methods': 'methods',
-        'methodology': 'methodology',
-        'result': 'results',
-        'results': 'results',
-        'discussion': 'discussion',
-        'conclusion': 'conclusion',
-        'conclusions': 'conclusions',
-        'background': 'background',
-        'related': 'related work',
-        'experiment': 'experiments',
-        'experiments': 'experiments',
-        'evaluation': 'evaluation',
-        'appendix': 'appendix',
-        'supplement': 'supplementary material',
-    }
-    
-    for key, section in section_mappings.items():
-        if key in name_lower:
-            return section
+    match = _SECTION_RE.search(filename.lower())
+    if match:
+        return _SECTION_MAPPINGS[match.group(0)]
     return None
 
 
+# File tool handlers: each takes (filename, current_stage, current_idx, file_path)
+# and returns a (stage, message) tuple.
+
+def _read_tex(filename: str, current_stage: str, current_idx: int, file_path: str) -> tuple:
+    section = _get_section_from_filename(filename)
+    if section:
+        return ("writing", f"Reading {section} section")
+    return ("writing", f"Reading {filename}")
+
+
+def _write_tex(filename: str, current_stage: str, current_idx: int, file_path: str) -> tuple:
+    section = _get_section_from_filename(filename)
+    if section:
+        return ("writing", f"Writing {section} section")
+    elif "main" in filename.lower():
+        doc_type = _detect_document_type(file_path)
+        return ("writing", f"Creating main {doc_type} structure")
+    elif current_idx < _STAGE_INDEX["writing"]:
+        doc_type = _detect_document_type(file_path)
+        return ("writing", f"Writing {doc_type}: {filename}")
+    else:
+        return ("compilation", f"Updating {filename}")
+
+
+def _write_md(filename: str, current_stage: str, current_idx: int, file_path: str) -> tuple:
+    filename_lower = filename.lower()
+    if "progress" in filename_lower:
+        return ("writing", "Updating progress log")
+    elif "readme" in filename_lower:
+        return ("complete", "Creating documentation")
+    return ("writing", f"Writing {filename}")
+
+
+def _edit_tex(filename: str, current_stage: str, current_idx: int, file_path: str) -> tuple:
+    section = _get_section_from_filename(filename)
+    if section:
+        return ("writing", f"Refining {section} section")
+    return ("writing", f"Editing {filename}")
+
+
+_READ_HANDLERS = {
+    ".bib": lambda filename, *_: ("writing", f"Reading bibliography: {filename}"),
+    ".tex": _read_tex,
+    ".pdf": lambda filename, *_: ("research", f"Analyzing PDF: {filename}"),
+    ".csv": lambda filename, *_: ("research", f"Loading data from {filename}"),
+    ".json": lambda filename, *_: ("research", f"Reading configuration: {filename}"),
+    ".md": lambda filename, *_: ("planning", f"Reading {filename}"),
+}
+
+_WRITE_HANDLERS = {
+    ".bib": lambda *_: ("writing", "Creating bibliography with references"),
+    ".tex": _write_tex,
+    ".md": _write_md,
+    ".sty": lambda filename, *_: ("writing", f"Creating style file: {filename}"),
+    ".cls": lambda filename, *_: ("writing", f"Creating document class: {filename}"),
+}
+
+_EDIT_HANDLERS = {
+    ".tex": _edit_tex,
+    ".bib": lambda *_: ("writing", "Updating bibliography"),
+}
+
+# Tool name -> (suffix handlers, verb used for files without a handler)
+_FILE_TOOL_HANDLERS = {
+    "read": (_READ_HANDLERS, "Reading"),
+    "write": (_WRITE_HANDLERS, "Creating"),
+    "edit": (_EDIT_HANDLERS, "Editing"),
+}
+
+
 def _analyze_tool_use(tool_name: str, tool_input: Dict[str, Any], current_stage: str) -> tuple:
     """
     Analyze tool usage to provide dynamic, context-aware progress updates.
@@ -462,109 +732,55 @@ def _analyze_tool_use(tool_name: str, tool_input: Dict[str, Any], current_stage:
     Returns:
         Tuple of (stage, message) or None if no update needed
     """
-    # Stage order for progression
-    stage_order = ["initialization", "planning", "research", "writing", "compilation", "complete"]
-    current_idx = stage_order.index(current_stage) if current_stage in stage_order else 0
-    
-    # Extract relevant info from tool input
-    file_path = tool_input.get("file_path", tool_input.get("path", ""))
-    command = tool_input.get("command", "")
-    filename = Path(file_path).name if file_path else ""
-    doc_type = _detect_document_type(file_path)
-    
-    # Read tool - detect what's being read
-    if tool_name.lower() == "read":
-        if ".bib" in file_path:
-            return ("writing", f"Reading bibliography: {filename}")
-        elif ".tex" in file_path:
-            section = _get_section_from_filename(filename)
-            if section:
-                return ("writing", f"Reading {section} section")
-            return ("writing", f"Reading {filename}")
-        elif ".pdf" in file_path:
-            return ("research", f"Analyzing PDF: {filename}")
-        elif ".csv" in file_path:
-            return ("research", f"Loading data from {filename}")
-        elif ".json" in file_path:
-            return ("research", f"Reading configuration: {filename}")
-        elif ".md" in file_path:
-            return ("planning", f"Reading {filename}")
-        elif file_path:
-            return (current_stage, f"Reading {filename}")
-        return None
-    
-    # Write tool - detect what's being written
-    elif tool_name.lower() == "write":
-        if ".bib" in file_path:
-            return ("writing", f"Creating bibliography with references")
-        elif ".tex" in file_path:
-            section = _get_section_from_filename(filename)
-            if section:
-                return ("writing", f"Writing {section} section")
-            elif "main" in filename.lower():
-                return ("writing", f"Creating main {doc_type} structure")
-            elif current_idx < stage_order.index("writing"):
-                return ("writing", f"Writing {doc_type}: {filename}")
-            else:
-                return ("compilation", f"Updating {filename}")
-        elif ".md" in file_path:
-            if "progress" in filename.lower():
-                return ("writing", "Updating progress log")
-            elif "readme" in filename.lower():
-                return ("complete", "Creating documentation")
-            return ("writing", f"Writing {filename}")
-        elif ".sty" in file_path:
-            return ("writing", f"Creating style file: {filename}")
-        elif ".cls" in file_path:
-            return ("writing", f"Creating document class: {filename}")
-        elif file_path:
-            return (current_stage, f"Creating {filename}")
-        return None
+    tool = tool_name.lower()
     
-    # Edit tool
-    elif tool_name.lower() == "edit":
-        if ".tex" in file_path:
-            section = _get_section_from_filename(filename)
-            if section:
-                return ("writing", f"Refining {section} section")
-            return ("writing", f"Editing {filename}")
-        elif ".bib" in file_path:
-            return ("writing", "Updating bibliography")
-        elif file_path:
-            return (current_stage, f"Editing {filename}")
-        return None
+    # Read/Write/Edit tools - dispatch on file suffix
+    if tool in _FILE_TOOL_HANDLERS:
+        file_path = tool_input.get("file_path", tool_input.get("path", ""))
+        if not file_path:
+            return None
+        path = Path(file_path)
+        filename = path.name
+        handlers, verb = _FILE_TOOL_HANDLERS[tool]
+        handler = handlers.get(path.suffix.lower())
+        if handler:
+            return handler(filename, current_stage, _STAGE_INDEX.get(current_stage, 0), file_path)
+        return (current_stage, f"{verb} {filename}")
     
     # Bash tool - detect compilation and other commands
-    elif tool_name.lower() == "bash":
-        if "pdflatex" in command:
+    elif tool == "bash":
+        command = tool_input.get("command", "")
+        found = set(_BASH_COMMAND_RE.findall(command))
+        if "pdflatex" in found:
             # Try to extract filename from command
             if "-output-directory" in command:
                 return ("compilation", "Compiling PDF with output directory")
             return ("compilation", "Compiling LaTeX to PDF")
-        elif "latexmk" in command:
+        elif "latexmk" in found:
             return ("compilation", "Running full LaTeX compilation pipeline")
-        elif "bibtex" in command:
+        elif "bibtex" in found:
             return ("compilation", "Processing bibliography citations")
-        elif "makeindex" in command:
+        elif "makeindex" in found:
             return ("compilation", "Building document index")
-        elif "mkdir" in command:
+        elif "mkdir" in found:
             # Try to extract directory purpose
-            if "writing_outputs" in command or "output" in command.lower():
+            command_lower = command.lower()
+            if "writing_outputs" in command or "output" in command_lower:
                 return ("initialization", "Creating output directory")
-            elif "figures" in command.lower():
+            elif "figures" in command_lower:
                 return ("initialization", "Setting up figures directory")
-            elif "drafts" in command.lower():
+            elif "drafts" in command_lower:
                 return ("initialization", "Setting up drafts directory")
             return ("initialization", "Creating directory structure")
-        elif "cp " in command:
+        elif "cp" in found:
             if ".pdf" in command:
                 return ("complete", "Copying final PDF to output")
             elif ".tex" in command:
                 return ("complete", "Archiving LaTeX source")
             return ("complete", "Organizing files")
-        elif "mv " in command:
+        elif "mv" in found:
             return ("complete", "Moving files to final location")
-        elif "ls " in command or "cat " in command:
+        elif "ls" in found or "cat" in found:
             return None  # Don't report on inspection commands
         elif command:
             # Truncate long commands intelligently
@@ -573,7 +789,7 @@ def _analyze_tool_use(tool_name: str, tool_input: Dict[str, Any], current_stage:
         return None
     
     # Research lookup tool
-    elif "research" in tool_name.lower() or "lookup" in tool_name.lower():
+    elif "research" in tool or "lookup" in tool:
         query_text = tool_input.get("query", "")
         if query_text:
             # Truncate but keep meaningful content
@@ -582,7 +798,7 @@ def _analyze_tool_use(tool_name: str, tool_input: Dict[str, Any], current_stage:
         return ("research", "Searching literature databases")
     
     # Web search or similar tools
-    elif "search" in tool_name.lower() or "web" in tool_name.lower():
+    elif "search" in tool or "web" in tool:
         query_text = tool_input.get("query", tool_input.get("search_term", ""))
         if query_text:
             truncated = query_text[:40] + "..." if len(query_text) > 40 else query_text
@@ -604,34 +820,58 @@ def _find_most_recent_output(output_folder: Path, start_time: float) -> Optional
         Path to output directory or None
     """
     try:
-        output_dirs = [d for d in output_folder.iterdir() if d.is_dir()]
-        if not output_dirs:
-            return None
-        
-        # Filter to only directories modified after start_time
-        recent_dirs = [
-            d for d in output_dirs 
-            if d.stat().st_mtime >= start_time - 5  # 5 second buffer
-        ]
-        
-        if not recent_dirs:
-            # Fallback to most recent directory overall
-            recent_dirs = output_dirs
-        
-        # Return the most recent
-        most_recent = max(recent_dirs, key=lambda d: d.stat().st_mtime)
-        return most_recent
+        # Single pass tracking the newest directory. Directories modified after
+        # start_time (with a 5 second buffer) are preferred, but when there are
+        # none the newest directory overall is used, so the newest wins either way.
+        most_recent = None
+        most_recent_mtime = 0.0
+        with os.scandir(output_folder) as entries:
+            for entry in entries:
+                # DirEntry.is_dir() uses the cached directory entry type
+                if not entry.is_dir():
+                    continue
+                mtime = entry.stat().st_mtime
+                if most_recent is None or mtime > most_recent_mtime:
+                    most_recent, most_recent_mtime = entry.path, mtime
+        return Path(most_recent) if most_recent else None
     except Exception:
         return None
 
 
-def _build_paper_result(paper_dir: Path, file_info: Dict[str, Any]) -> PaperResult:
+def _prefetch_final_tex(paper_dir: Path) -> Optional[tuple]:
+    """
+    Parse the final .tex file ahead of the full directory scan.
+    
+    Args:
+        paper_dir: Path to paper directory
+    
+    Returns:
+        Tuple of (tex path, parse_tex_once result), or None if final/ has no .tex
+    """
+    tex_file = None
+    final_dir = paper_dir / "final"
+    if final_dir.exists():
+        # Same selection as scan_paper_directory: the last .tex listed wins
+        for file in final_dir.iterdir():
+            if file.is_file() and file.suffix == '.tex':
+                tex_file = str(file)
+    if tex_file is None:
+        return None
+    return tex_file, parse_tex_once(tex_file)
+
+
+def _build_paper_result(
+    paper_dir: Path,
+    file_info: Dict[str, Any],
+    tex_prefetch: Optional[tuple] = None,
+) -> PaperResult:
     """
     Build a comprehensive PaperResult from scanned files.
     
     Args:
         paper_dir: Path to paper directory
         file_info: Dictionary of file information from scan_paper_directory
+        tex_prefetch: Optional (tex path, parse_tex_once result) from _prefetch_final_tex
     
     Returns:
         PaperResult object
@@ -639,8 +879,10 @@ def _build_paper_result(paper_dir: Path, file_info: Dict[str, Any]) -> PaperResu
     # Extract metadata
     tex_file = file_info['tex_final'] or (file_info['tex_drafts'][0] if file_info['tex_drafts'] else None)
     
-    title = extract_title_from_tex(tex_file)
-    word_count = count_words_in_tex(tex_file)
+    if tex_prefetch and tex_prefetch[0] == tex_file:
+        tex_info = tex_prefetch[1]
+    else:
+        tex_info = parse_tex_once(tex_file)
     
     # Extract topic from directory name
     topic = ""
@@ -649,10 +891,10 @@ def _build_paper_result(paper_dir: Path, file_info: Dict[str, Any]) -> PaperResu
         topic = parts[2].replace('_', ' ')
     
     metadata = PaperMetadata(
-        title=title,
-        created_at=datetime.fromtimestamp(paper_dir.stat().st_ctime).isoformat() + "Z",
+        title=tex_info['title'],
+        created_at=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(paper_dir.stat().st_ctime)),
         topic=topic,
-        word_count=word_count,
+        word_count=tex_info['word_count'],
     )
     
     # Build files object
@@ -703,21 +945,19 @@ def _build_paper_result(paper_dir: Path, file_info: Dict[str, Any]) -> PaperResu
     return result
 
 
-def _create_error_result(error_message: str) -> Dict[str, Any]:
+def _create_error_result(error_message: str) -> PaperResult:
     """
-    Create an error result dictionary.
+    Create a failed PaperResult.
     
     Args:
         error_message: Error message string
     
     Returns:
-        Dictionary with error information
+        PaperResult with error information
     """
-    result = PaperResult(
+    return PaperResult(
         status="failed",
         paper_directory="",
         paper_name="",
         errors=[error_message],
     )
-    return result.to_dict()
-
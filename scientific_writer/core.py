@@ -1,14 +1,30 @@
 """Core utilities for scientific writer."""
 
+import functools
 import os
 import shutil
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional, List, Dict, Any
-from dotenv import load_dotenv
 
-# Load environment variables from .env file if it exists
-load_dotenv()
+# File extension sets used to route data files; see the get_*_extensions() helpers
+_IMAGE_EXTS = frozenset({'.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tiff', '.tif', '.svg', '.webp', '.ico'})
+_MANUSCRIPT_EXTS = frozenset({'.tex'})
+_SOURCE_EXTS = frozenset({'.md', '.docx', '.pdf'})
+_DATA_EXTS = frozenset({'.csv', '.json', '.txt', '.xlsx', '.xls', '.tsv', '.xml', '.yaml', '.yml', '.sql'})
+
+# Extension -> (file type, output subfolder, whether the extension is recorded) for
+# process_data_files. Later entries take priority: manuscript (.tex) → drafts/,
+# images → figures/, data files → data/, source files → sources/.
+_EXT_ROUTE = {
+    **{ext: ('source', 'sources', True) for ext in _SOURCE_EXTS},
+    **{ext: ('data', 'data', False) for ext in _DATA_EXTS},
+    **{ext: ('image', 'figures', False) for ext in _IMAGE_EXTS},
+    **{ext: ('manuscript', 'drafts', True) for ext in _MANUSCRIPT_EXTS},
+}
+# Everything else goes to sources/
+_DEFAULT_ROUTE = ('source', 'sources', True)
 
 
 def setup_claude_skills(package_dir: Path, work_dir: Path) -> None:
@@ -32,6 +48,20 @@ def setup_claude_skills(package_dir: Path, work_dir: Path) -> None:
     # Note: No warning prints - keep API output clean
 
 
+@functools.lru_cache(maxsize=1)
+def _ensure_dotenv() -> None:
+    """
+    Load environment variables from a .env file, once per process.
+    
+    Set SCIWRITER_SKIP_DOTENV=1 to skip loading entirely.
+    """
+    if os.environ.get('SCIWRITER_SKIP_DOTENV') == '1':
+        return
+    from dotenv import load_dotenv
+    
+    load_dotenv()
+
+
 def get_api_key(api_key: Optional[str] = None) -> str:
     """
     Get the Anthropic API key.
@@ -45,6 +75,9 @@ def get_api_key(api_key: Optional[str] = None) -> str:
     Raises:
         ValueError: If API key is not found.
     """
+    # Load .env even when a key is passed in: it also carries settings such as
+    # OPENROUTER_API_KEY that the agent's tools read from the environment
+    _ensure_dotenv()
     if api_key:
         return api_key
     
@@ -95,24 +128,24 @@ def ensure_output_folder(cwd: Path, custom_dir: Optional[str] = None) -> Path:
     return output_folder
 
 
-def get_image_extensions() -> set:
+def get_image_extensions() -> frozenset:
     """Return a set of common image file extensions."""
-    return {'.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tiff', '.tif', '.svg', '.webp', '.ico'}
+    return _IMAGE_EXTS
 
 
-def get_manuscript_extensions() -> set:
+def get_manuscript_extensions() -> frozenset:
     """Return a set of manuscript file extensions that should go to drafts/ folder."""
-    return {'.tex'}
+    return _MANUSCRIPT_EXTS
 
 
-def get_source_extensions() -> set:
+def get_source_extensions() -> frozenset:
     """Return a set of source/context file extensions that should go to sources/ folder."""
-    return {'.md', '.docx', '.pdf'}
+    return _SOURCE_EXTS
 
 
-def get_data_extensions() -> set:
+def get_data_extensions() -> frozenset:
     """Return a set of data file extensions that should go to data/ folder."""
-    return {'.csv', '.json', '.txt', '.xlsx', '.xls', '.tsv', '.xml', '.yaml', '.yml', '.sql'}
+    return _DATA_EXTS
 
 
 def get_data_files(cwd: Path, data_files: Optional[List[str]] = None) -> List[Path]:
@@ -121,24 +154,27 @@ def get_data_files(cwd: Path, data_files: Optional[List[str]] = None) -> List[Pa
     
     Args:
         cwd: Current working directory (project root).
-        data_files: Optional list of file paths. If not provided, reads from data/ folder.
+        data_files: Optional list of file paths, relative paths being taken from cwd.
+            If not provided, reads from data/ folder.
         
     Returns:
         List of Path objects for data files.
     """
     if data_files:
-        return [Path(f).resolve() for f in data_files]
+        # join + normpath avoids the getcwd/readlink syscalls of Path.resolve()
+        return [Path(os.path.normpath(os.path.join(cwd, f))) for f in data_files]
     
     data_folder = cwd / "data"
     if not data_folder.exists():
         return []
     
-    files = []
-    for file_path in data_folder.iterdir():
-        if file_path.is_file():
-            files.append(file_path)
-    
-    return files
+    # DirEntry.is_file() answers from the directory listing, without a stat per file
+    with os.scandir(data_folder) as entries:
+        return [Path(entry.path) for entry in entries if entry.is_file()]
+
+
+# Docx media members below this uncompressed size are extracted with a single read/write
+_SMALL_MEDIA_BYTES = 64 * 1024
 
 
 def extract_images_from_docx(docx_path: Path, figures_output: Path) -> List[Dict[str, Any]]:
@@ -157,36 +193,38 @@ def extract_images_from_docx(docx_path: Path, figures_output: Path) -> List[Dict
         Each dict has 'name', 'path', and 'source_docx' keys.
     """
     extracted_images = []
-    image_extensions = get_image_extensions()
     
     try:
-        with zipfile.ZipFile(docx_path, 'r') as zip_ref:
-            # List all files in the archive
-            all_files = zip_ref.namelist()
-            
-            # Filter for files in word/media/ directory that are images
-            media_files = [f for f in all_files if f.startswith('word/media/')]
+        # allowZip64=True is the default (it only affects writing); passed to make the intent explicit
+        with zipfile.ZipFile(docx_path, 'r', allowZip64=True) as zip_ref:
+            # Select image files in the word/media/ directory in one pass over the archive index,
+            # slicing out the member's base filename instead of building a Path per entry
+            media_members = []
+            for info in zip_ref.infolist():
+                member_name = info.filename
+                if member_name.startswith('word/media/'):
+                    file_name = member_name[member_name.rfind('/') + 1:]
+                    if _lower_suffix(file_name) in _IMAGE_EXTS:
+                        media_members.append((info, file_name))
             
-            for media_file in media_files:
-                # Get the filename from the path
-                file_name = Path(media_file).name
-                file_ext = Path(media_file).suffix.lower()
+            for info, file_name in media_members:
+                # Extract to figures folder under the member's base filename
+                output_path = figures_output / file_name
+                
+                if info.file_size < _SMALL_MEDIA_BYTES:
+                    # Small images (icons, separators): read and write in one call each
+                    output_path.write_bytes(zip_ref.read(info))
+                else:
+                    # Stream the file from the zip to the output in 1 MiB chunks
+                    with zip_ref.open(info) as source:
+                        with output_path.open('wb') as target:
+                            shutil.copyfileobj(source, target, 1024 * 1024)
                 
-                # Only extract if it's an image file
-                if file_ext in image_extensions:
-                    # Extract to figures folder
-                    output_path = figures_output / file_name
-                    
-                    # Read the file from the zip and write it to the output
-                    with zip_ref.open(media_file) as source:
-                        with open(output_path, 'wb') as target:
-                            target.write(source.read())
-                    
-                    extracted_images.append({
-                        'name': file_name,
-                        'path': str(output_path),
-                        'source_docx': docx_path.name
-                    })
+                extracted_images.append({
+                    'name': file_name,
+                    'path': str(output_path),
+                    'source_docx': docx_path.name
+                })
     
     except zipfile.BadZipFile:
         print(f"Warning: {docx_path.name} is not a valid .docx file (ZIP archive)")
@@ -196,6 +234,59 @@ def extract_images_from_docx(docx_path: Path, figures_output: Path) -> List[Dict
     return extracted_images
 
 
+def _lower_suffix(file_name: str) -> str:
+    """Return the lowercased equivalent of Path(file_name).suffix without building a Path."""
+    dot = file_name.rfind('.')
+    if 0 < dot < len(file_name) - 1:
+        return file_name[dot:].lower()
+    return ''
+
+
+def _ensure_dir(path: Path, created: set) -> None:
+    """Create path (with parents) unless it is already in the created set."""
+    if path not in created:
+        path.mkdir(parents=True, exist_ok=True)
+        created.add(path)
+
+
+def _transfer_files(
+    jobs: List[tuple],
+    delete_originals: bool,
+) -> Dict[int, Exception]:
+    """
+    Copy (or move) files that share one destination, in order.
+    
+    Args:
+        jobs: List of (index, source path, destination path) tuples.
+        delete_originals: Whether to move the files instead of copying them.
+        
+    Returns:
+        Dictionary mapping the index of each failed job to its exception.
+    """
+    errors = {}
+    for index, file_path, destination in jobs:
+        try:
+            if delete_originals:
+                # Move the original: a rename on the same filesystem, copy + delete otherwise.
+                # Symlinks are always copied so the destination gets the target's contents
+                # rather than a (possibly dangling) link
+                moved = False
+                if not file_path.is_symlink():
+                    try:
+                        os.replace(file_path, destination)
+                        moved = True
+                    except OSError:
+                        pass
+                if not moved:
+                    shutil.copy2(file_path, destination)
+                    file_path.unlink()
+            else:
+                shutil.copy2(file_path, destination)
+        except Exception as e:
+            errors[index] = e
+    return errors
+
+
 def process_data_files(
     cwd: Path, 
     data_files: List[Path], 
@@ -228,16 +319,15 @@ def process_data_files(
     drafts_output = paper_output / "drafts"
     sources_output = paper_output / "sources"
     
-    # Ensure output directories exist
-    data_output.mkdir(parents=True, exist_ok=True)
-    figures_output.mkdir(parents=True, exist_ok=True)
-    drafts_output.mkdir(parents=True, exist_ok=True)
-    sources_output.mkdir(parents=True, exist_ok=True)
+    # Output directories are created on first use
+    created_dirs = set()
     
-    image_extensions = get_image_extensions()
-    manuscript_extensions = get_manuscript_extensions()
-    source_extensions = get_source_extensions()
-    data_extensions = get_data_extensions()
+    output_dirs = {
+        'data': data_output,
+        'figures': figures_output,
+        'drafts': drafts_output,
+        'sources': sources_output,
+    }
     
     processed_info = {
         'data_files': [],
@@ -246,78 +336,111 @@ def process_data_files(
         'source_files': [],
         'all_files': []
     }
+    processed_info_by_type = {
+        'manuscript': processed_info['manuscript_files'],
+        'image': processed_info['image_files'],
+        'data': processed_info['data_files'],
+        'source': processed_info['source_files'],
+    }
     
+    # First pass: route each file (no copying yet). The routing table is bound
+    # locally so the loop does not look it up in module globals per file
+    route_for_ext = _EXT_ROUTE.get
+    jobs = []
+    has_docx = False
     for file_path in data_files:
-        file_ext = file_path.suffix.lower()
         file_name = file_path.name
+        file_ext = _lower_suffix(file_name)
         
-        # Determine destination based on file type
-        # Priority: manuscript (.tex) → drafts/, images → figures/, 
-        # data files → data/, source files → sources/, everything else → sources/
+        # Determine destination based on file type. CRITICAL: only .tex files
+        # go to drafts/ folder for editing workflow
+        file_type, subdir, record_extension = route_for_ext(file_ext, _DEFAULT_ROUTE)
+        destination = output_dirs[subdir] / file_name
+        destination_str = os.fspath(destination)
+        original_str = os.fspath(file_path)
+        file_info = {
+            'name': file_name,
+            'path': destination_str,
+            'original': original_str
+        }
+        if record_extension:
+            file_info['extension'] = file_ext
+        processed_info_by_type[file_type].append(file_info)
         
-        if file_ext in manuscript_extensions:
-            # CRITICAL: Only .tex files go to drafts/ folder for editing workflow
-            destination = drafts_output / file_name
-            file_type = 'manuscript'
-            processed_info['manuscript_files'].append({
-                'name': file_name,
-                'path': str(destination),
-                'original': str(file_path),
-                'extension': file_ext
-            })
-        elif file_ext in image_extensions:
-            destination = figures_output / file_name
-            file_type = 'image'
-            processed_info['image_files'].append({
-                'name': file_name,
-                'path': str(destination),
-                'original': str(file_path)
-            })
-        elif file_ext in data_extensions:
-            destination = data_output / file_name
-            file_type = 'data'
-            processed_info['data_files'].append({
-                'name': file_name,
-                'path': str(destination),
-                'original': str(file_path)
-            })
+        try:
+            _ensure_dir(destination.parent, created_dirs)
+        except Exception as e:
+            print(f"Warning: Could not process {file_name}: {str(e)}")
+            continue
+        jobs.append((file_path, file_name, file_ext, file_type, destination, destination_str))
+        if file_ext == '.docx':
+            has_docx = True
+    
+    # Copy (or move) files concurrently. Files sharing a destination are handled
+    # in order by one worker so the last one still wins. Anything that writes to
+    # figures/ when .docx images are extracted (the .docx files themselves and
+    # directly provided images) is transferred below, in input order
+    sequential = set()
+    jobs_by_destination = {}
+    for index, (file_path, file_name, file_ext, file_type, destination, destination_str) in enumerate(jobs):
+        if file_ext == '.docx' or (has_docx and file_type == 'image'):
+            sequential.add(index)
         else:
-            # Source files (.md, .docx, .pdf) and everything else go to sources/
-            destination = sources_output / file_name
-            file_type = 'source'
-            processed_info['source_files'].append({
-                'name': file_name,
-                'path': str(destination),
-                'original': str(file_path),
-                'extension': file_ext
-            })
+            jobs_by_destination.setdefault(destination, []).append((index, file_path, destination))
+    
+    errors = {}
+    if len(jobs_by_destination) >= 2:
+        with ThreadPoolExecutor(max_workers=min(8, len(jobs_by_destination))) as pool:
+            futures = [
+                pool.submit(_transfer_files, group, delete_originals)
+                for group in jobs_by_destination.values()
+            ]
+            for future in futures:
+                errors.update(future.result())
+    else:
+        # A single destination gains nothing from a pool
+        for group in jobs_by_destination.values():
+            errors.update(_transfer_files(group, delete_originals))
+    
+    # Record results and extract docx images in input order (docx files often
+    # share image names, so extraction stays sequential)
+    for index, (file_path, file_name, file_ext, file_type, destination, destination_str) in enumerate(jobs):
+        if index in sequential:
+            errors.update(_transfer_files([(index, file_path, destination)], delete_originals))
+        if index in errors:
+            print(f"Warning: Could not process {file_name}: {str(errors[index])}")
+            continue
         
-        # Copy the file
-        try:
-            shutil.copy2(file_path, destination)
-            processed_info['all_files'].append({
-                'name': file_name,
-                'type': file_type,
-                'destination': str(destination)
-            })
-            
-            # If it's a .docx file, extract images to figures folder
-            if file_ext == '.docx':
-                extracted_images = extract_images_from_docx(file_path, figures_output)
+        processed_info['all_files'].append({
+            'name': file_name,
+            'type': file_type,
+            'destination': destination_str
+        })
+        
+        # If it's a .docx file, extract images to figures folder
+        if file_ext == '.docx':
+            try:
+                _ensure_dir(figures_output, created_dirs)
+                extracted_images = extract_images_from_docx(destination, figures_output)
                 if extracted_images:
                     for img_info in extracted_images:
                         processed_info['image_files'].append(img_info)
-            
-            # Delete the original file after successful copy if requested
-            if delete_originals:
-                file_path.unlink()
-            
-        except Exception as e:
-            print(f"Warning: Could not process {file_name}: {str(e)}")
+            except Exception as e:
+                print(f"Warning: Could not process {file_name}: {str(e)}")
     
     return processed_info
 
 
+# Instructions appended to the data context when manuscript files are provided
+_EDITING_TASK_LINES = (
+    "\n🔧 TASK: This is an EDITING task, not creating from scratch.",
+    "   → Read the existing manuscript from drafts/",
+    "   → Apply the requested changes/improvements",
+    "   → Create new version following version numbering protocol",
+    "   → Document changes in revision_notes.md",
+)
+
+
 def create_data_context_message(processed_info: Optional[Dict[str, Any]]) -> str:
     """
     Create a context message about available data files.
@@ -337,25 +460,26 @@ def create_data_context_message(processed_info: Optional[Dict[str, Any]]) -> str
     if processed_info.get('manuscript_files'):
         context_parts.append("\n⚠️  EDITING MODE - Manuscript files (.tex) detected!")
         context_parts.append("\nManuscript files (in drafts/ folder for editing):")
-        for file_info in processed_info['manuscript_files']:
-            context_parts.append(f"  - {file_info['name']} ({file_info['extension']}): {file_info['path']}")
-        context_parts.append("\n🔧 TASK: This is an EDITING task, not creating from scratch.")
-        context_parts.append("   → Read the existing manuscript from drafts/")
-        context_parts.append("   → Apply the requested changes/improvements")
-        context_parts.append("   → Create new version following version numbering protocol")
-        context_parts.append("   → Document changes in revision_notes.md")
+        context_parts.extend(
+            f"  - {file_info['name']} ({file_info['extension']}): {file_info['path']}"
+            for file_info in processed_info['manuscript_files']
+        )
+        context_parts.extend(_EDITING_TASK_LINES)
     
     if processed_info.get('source_files'):
         context_parts.append("\nSource/Context files (in sources/ folder for reference):")
-        for file_info in processed_info['source_files']:
-            ext = file_info.get('extension', '')
-            context_parts.append(f"  - {file_info['name']} ({ext}): {file_info['path']}")
+        context_parts.extend(
+            f"  - {file_info['name']} ({file_info['extension']}): {file_info['path']}"
+            for file_info in processed_info['source_files']
+        )
         context_parts.append("\nNote: These files are available as reference/context material.")
     
     if processed_info.get('data_files'):
         context_parts.append("\nData files (in data/ folder):")
-        for file_info in processed_info['data_files']:
-            context_parts.append(f"  - {file_info['name']}: {file_info['path']}")
+        context_parts.extend(
+            f"  - {file_info['name']}: {file_info['path']}"
+            for file_info in processed_info['data_files']
+        )
     
     if processed_info.get('image_files'):
         # Separate images by source (direct vs extracted from docx)
@@ -366,20 +490,22 @@ def create_data_context_message(processed_info: Optional[Dict[str, Any]]) -> str
         
         if direct_images:
             context_parts.append("  Directly provided:")
-            for file_info in direct_images:
-                context_parts.append(f"    - {file_info['name']}: {file_info['path']}")
+            context_parts.extend(
+                f"    - {file_info['name']}: {file_info['path']}"
+                for file_info in direct_images
+            )
         
         if extracted_images:
             # Group extracted images by source docx
-            from collections import defaultdict
-            images_by_docx = defaultdict(list)
+            images_by_docx = {}
             for img in extracted_images:
-                images_by_docx[img['source_docx']].append(img)
+                images_by_docx.setdefault(img['source_docx'], []).append(img)
             
             context_parts.append("  Extracted from .docx files:")
-            for docx_name, images in images_by_docx.items():
-                img_names = ', '.join([img['name'] for img in images])
-                context_parts.append(f"    - From {docx_name}: {img_names}")
+            context_parts.extend(
+                f"    - From {docx_name}: {', '.join(img['name'] for img in images)}"
+                for docx_name, images in images_by_docx.items()
+            )
         
         context_parts.append("\nNote: These images can be referenced as figures in the paper.")
     
@@ -238,6 +238,75 @@ def extract_citation_style(bib_file: Optional[str]) -> str:
     return "BibTeX"
 
 
+# Patterns shared by the LaTeX helpers below
+_LATEX_COMMAND_RE = re.compile(r'\\[a-zA-Z]+(\[.*?\])?(\{.*?\})?')
+_LATEX_COMMENT_RE = re.compile(r'%.*')
+_LATEX_SPECIAL_CHARS_RE = re.compile(r'[{}$\\]')
+_LATEX_TITLE_RE = re.compile(r'\\title\s*\{([^}]+)\}')
+
+
+def _count_words_in_tex_content(content: str) -> int:
+    """Estimate word count of LaTeX source text."""
+    # Remove LaTeX commands
+    content = _LATEX_COMMAND_RE.sub('', content)
+    # Remove comments
+    content = _LATEX_COMMENT_RE.sub('', content)
+    # Remove special characters
+    content = _LATEX_SPECIAL_CHARS_RE.sub('', content)
+    
+    # Count words
+    return len(content.split())
+
+
+def _extract_title_from_tex_content(content: str) -> Optional[str]:
+    """Extract the \\title{...} of LaTeX source text, or None if not found."""
+    match = _LATEX_TITLE_RE.search(content)
+    if match:
+        title = match.group(1)
+        # Clean up LaTeX commands in title
+        title = _LATEX_COMMAND_RE.sub('', title)
+        return title.strip()
+    return None
+
+
+def _read_tex_content(tex_file: Optional[str]) -> Optional[str]:
+    """Read a LaTeX file, returning None if no path is given or it can't be read."""
+    if not tex_file:
+        return None
+    try:
+        with open(tex_file, 'r', encoding='utf-8') as f:
+            return f.read()
+    except Exception:
+        return None
+
+
+def parse_tex_once(tex_file: Optional[str]) -> Dict[str, Any]:
+    """
+    Extract title and word count from a LaTeX file with a single read.
+    
+    Args:
+        tex_file: Path to the .tex file.
+        
+    Returns:
+        Dictionary with 'title' and 'word_count' keys; values are None if the
+        file doesn't exist or can't be read.
+    """
+    result = {'title': None, 'word_count': None}
+    content = _read_tex_content(tex_file)
+    if content is None:
+        return result
+    
+    try:
+        result['title'] = _extract_title_from_tex_content(content)
+    except Exception:
+        pass
+    try:
+        result['word_count'] = _count_words_in_tex_content(content)
+    except Exception:
+        pass
+    return result
+
+
 def count_words_in_tex(tex_file: Optional[str]) -> Optional[int]:
     """
     Estimate word count in a LaTeX file.
@@ -248,23 +317,11 @@ def count_words_in_tex(tex_file: Optional[str]) -> Optional[int]:
     Returns:
         Estimated word count, or None if file doesn't exist.
     """
-    if not tex_file or not Path(tex_file).exists():
+    content = _read_tex_content(tex_file)
+    if content is None:
         return None
-    
     try:
-        with open(tex_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-            # Remove LaTeX commands
-            content = re.sub(r'\\[a-zA-Z]+(\[.*?\])?(\{.*?\})?', '', content)
-            # Remove comments
-            content = re.sub(r'%.*', '', content)
-            # Remove special characters
-            content = re.sub(r'[{}$\\]', '', content)
-            
-            # Count words
-            words = content.split()
-            return len(words)
+        return _count_words_in_tex_content(content)
     except Exception:
         return None
 
@@ -279,22 +336,10 @@ def extract_title_from_tex(tex_file: Optional[str]) -> Optional[str]:
     Returns:
         Title string, or None if not found.
     """
-    if not tex_file or not Path(tex_file).exists():
+    content = _read_tex_content(tex_file)
+    if content is None:
         return None
-    
     try:
-        with open(tex_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-            # Look for \title{...}
-            match = re.search(r'\\title\s*\{([^}]+)\}', content)
-            if match:
-                title = match.group(1)
-                # Clean up LaTeX commands in title
-                title = re.sub(r'\\[a-zA-Z]+(\[.*?\])?(\{.*?\})?', '', title)
-                return title.strip()
+        return _extract_title_from_tex_content(content)
     except Exception:
-        pass
-    
-    return None
-
+        return None